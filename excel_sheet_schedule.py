@@ -1,15 +1,17 @@
+from itertools import zip_longest
+
 import pandas as pd
 from openpyxl import Workbook
-from openpyxl.styles import Alignment, Font, PatternFill, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, PatternFill, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
 
 # Load CSV
 csv_path = "final_workshop_fixed.csv"  # adjust as needed
 df = pd.read_csv(csv_path)
 
-# Initialize Excel workbook
-wb = Workbook()
-wb.remove(wb.active)
+# Initialize Excel workbook; write-only sheets stream their rows to disk
+wb = Workbook(write_only=True)
 
 # Styles
 header_fill = PatternFill(start_color="B7DEE8", end_color="B7DEE8", fill_type="solid")
@@ -18,6 +20,17 @@ thin_border = Border(
     left=Side(style='thin'), right=Side(style='thin'),
     top=Side(style='thin'), bottom=Side(style='thin')
 )
+wb.add_named_style(NamedStyle(
+    name="workshop_header", font=bold_font, fill=header_fill,
+    border=thin_border, alignment=Alignment(horizontal='center'),
+))
+wb.add_named_style(NamedStyle(name="student_cell", border=thin_border))
+
+
+def styled_cell(ws, value, style):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
 
 def clean_sheet_name(day, session):
     session_label = {0: "All-day", 1: "Morning", 2: "Afternoon"}.get(session, f"Session{session}")
@@ -26,40 +39,26 @@ def clean_sheet_name(day, session):
 # Generate one sheet per session
 unique_sessions = df[['Day', 'Session']].drop_duplicates()
 
-for _, row in unique_sessions.iterrows():
-    day, session = row['Day'], row['Session']
+for day, session in unique_sessions.itertuples(index=False, name=None):
     sheet_name = clean_sheet_name(day, session)
     ws = wb.create_sheet(title=sheet_name[:31])
 
     # Filter relevant data
     session_data = df[(df['Day'] == day) & (df['Session'] == session)]
-    grouped = session_data.groupby('Workshop Title')['Student'].apply(list).reset_index()
-
-    # Store column widths
-    col_widths = {}
-
-    for col_idx, (_, grp) in enumerate(grouped.iterrows(), start=1):
-        workshop = grp['Workshop Title']
-        students = grp['Student']
-        col_letter = get_column_letter(col_idx)
-
-        # Header cell
-        header_cell = ws.cell(row=1, column=col_idx, value=workshop)
-        header_cell.font = bold_font
-        header_cell.fill = header_fill
-        header_cell.alignment = Alignment(horizontal='center')
-        header_cell.border = thin_border
-        col_widths[col_letter] = len(str(workshop))
+    grouped = session_data.groupby('Workshop Title')['Student'].apply(list)
 
-        # Student cells
-        for row_idx, student in enumerate(students, start=2):
-            cell = ws.cell(row=row_idx, column=col_idx, value=student)
-            cell.border = thin_border
-            col_widths[col_letter] = max(col_widths[col_letter], len(str(student)))
+    # Set column widths; write-only sheets need them before any row
+    for col_idx, (workshop, students) in enumerate(grouped.items(), start=1):
+        width = max(len(str(value)) for value in [workshop, *students])
+        ws.column_dimensions[get_column_letter(col_idx)].width = width + 2  # Add padding
 
-    # Set column widths
-    for col_letter, width in col_widths.items():
-        ws.column_dimensions[col_letter].width = width + 2  # Add padding
+    # Header row, then one row per position down the workshop columns
+    ws.append([styled_cell(ws, workshop, "workshop_header") for workshop in grouped.index])
+    for students in zip_longest(*grouped):
+        ws.append([
+            None if student is None else styled_cell(ws, student, "student_cell")
+            for student in students
+        ])
 
 # Save the Excel file
 output_path = "final_workshop_schedule_pretty.xlsx"
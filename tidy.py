@@ -1,3 +1,4 @@
+import re
 import pandas as pd
 from io import StringIO
 
@@ -8,15 +9,11 @@ valid_titles = set(schedule['Workshop Title'])
 
 def load_clean_csv(path: str) -> pd.DataFrame:
     """Read slightly malformed CSV exported with all fields quoted."""
-    lines = []
-    with open(path, encoding="utf-8") as f:
-        for line in f:
-            line = line.strip("\n").strip("\r")
-            if line.startswith("\"") and line.endswith("\""):
-                line = line[1:-1]
-            line = line.replace("\"\"", "\"")
-            lines.append(line)
-    return pd.read_csv(StringIO("\n".join(lines)), dtype=str)
+    with open(path, encoding="utf-8", newline="") as f:
+        text = f.read().replace("\r\n", "\n")
+    # unwrap the extra quotes around each row, then unescape the inner ones
+    text = re.sub(r'^"(.*)"$', r'\1', text, flags=re.MULTILINE)
+    return pd.read_csv(StringIO(text.replace("\"\"", "\"")), dtype=str)
 
 # 2) Load the student responses using the custom reader
 answers = load_clean_csv('student_answers_v4.csv')
@@ -36,43 +33,43 @@ do2_col = 'doeeiland_2'
 
 
 
-# 4) Prepare to build a “long” list of picks
-records = []
-warnings = []
-
-for _, row in answers.iterrows():
-    student = row['name']
-    student_class = row['class']
-    submitted_date = row['date']
-
-    for zone, col, rank in [
-        ('Zonbrein', zb1_col, 1),
-        ('Zonbrein', zb2_col, 2),
-        ('Expressiebaai', ex1_col, 1),
-        ('Expressiebaai', ex2_col, 2),
-        ('Doe-eiland', do1_col, 1),
-        ('Doe-eiland', do2_col, 2),
-    ]:
-        # split the two choices and strip whitespace
-        cell = row[col]
-        if pd.isna(cell):
-            continue
-        picks = [w.strip() for w in str(cell).split(',')]
-        for w in picks:
-            if w not in valid_titles:
-                warnings.append((student, zone, rank, w))
-            else:
-                records.append({
-                    'Student': student,
-                    'Class': student_class,
-                    'Date': submitted_date,
-                    'Zone': zone,
-                    'Rank': rank,
-                    'Workshop': w
-                })
-
-# 5) Turn into a DataFrame
-prefs_long = pd.DataFrame.from_records(records)
+# 4) Stack the six pick columns into a “long” frame, one row per pick
+pick_cols = {
+    zb1_col: ('Zonbrein', 1),
+    zb2_col: ('Zonbrein', 2),
+    ex1_col: ('Expressiebaai', 1),
+    ex2_col: ('Expressiebaai', 2),
+    do1_col: ('Doe-eiland', 1),
+    do2_col: ('Doe-eiland', 2),
+}
+picks = (
+    answers
+    .melt(id_vars=['name', 'class', 'date'], value_vars=list(pick_cols),
+          var_name='col', value_name='cell', ignore_index=False)
+    .dropna(subset=['cell'])
+    .sort_index(kind='stable')  # back to student order, columns as listed
+)
+picks['Zone'] = picks['col'].map({c: zone for c, (zone, _) in pick_cols.items()})
+picks['Rank'] = picks['col'].map({c: rank for c, (_, rank) in pick_cols.items()})
+
+# split the two choices and strip whitespace
+picks['Workshop'] = picks['cell'].str.split(',')
+picks = picks.explode('Workshop')
+picks['Workshop'] = picks['Workshop'].str.strip()
+valid = picks['Workshop'].isin(valid_titles)
+
+warnings = list(
+    picks.loc[~valid, ['name', 'Zone', 'Rank', 'Workshop']]
+    .itertuples(index=False, name=None)
+)
+
+# 5) Keep the valid picks as the preferences table
+prefs_long = (
+    picks[valid]
+    .rename(columns={'name': 'Student', 'class': 'Class', 'date': 'Date'})
+    [['Student', 'Class', 'Date', 'Zone', 'Rank', 'Workshop']]
+    .reset_index(drop=True)
+)
 
 # 6) (Optional) Show or save any invalid entries
 if warnings: